@@ -0,0 +1,6 @@
+"""
+Data pipeline for the corn and climate map.
+
+The stage functions live in corn_climate.pipeline and the command line
+entry point in corn_climate.cli. Importing this package does no work.
+"""
@@ -0,0 +1,256 @@
+"""
+Command line entry point for the corn and climate data pipeline.
+
+Only the standard library is imported at module level. pandas, geopandas and
+the pipeline stages are imported inside the subcommands that need them, so
+that --help, argument validation and dry runs return immediately.
+"""
+
+import argparse
+import contextlib
+import sys
+import time
+
+from . import config
+
+
+def _year_range(value):
+    try:
+        return config.parse_years(value)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value}")
+    return number
+
+
+@contextlib.contextmanager
+def _stage(timings, name):
+    start = time.perf_counter()
+    yield
+    if timings is not None:
+        timings[name] = time.perf_counter() - start
+
+
+def _check_inputs(args, climate=True):
+    climate_dir = args.climate_dir if climate else None
+    missing = config.missing_inputs(args.db, climate_dir)
+    for path in missing:
+        print(f"missing input: {path}", file=sys.stderr)
+    return not missing
+
+
+def _run_build(args, write=True, timings=None):
+    """
+    Run every pipeline stage, optionally writing the yearly GeoJSON files.
+    """
+    import sqlite3
+
+    with _stage(timings, "import"):
+        from . import pipeline
+
+    with _stage(timings, "load_geography"):
+        states_gdf, counties_gdf = pipeline.load_geography()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        with _stage(timings, "get_annual_data"):
+            annual_data = pipeline.get_annual_data(
+                conn, config.CROP_TABLE, config.AREA_TABLE
+            )
+        with _stage(timings, "build_rolling_grid"):
+            annual_data = pipeline.build_rolling_grid(
+                annual_data, config.FIRST_YEAR, block_size=args.block_size
+            )
+        with _stage(timings, "load_climate_data"):
+            climate_df = pipeline.load_climate_data(args.climate_dir)
+        with _stage(timings, "merge_climate_data"):
+            merged_df = pipeline.merge_climate_data(annual_data, climate_df)
+        with _stage(timings, "load_midwest_counties"):
+            midwest_counties_gdf = pipeline.load_midwest_counties(
+                conn, config.CROP_TABLE, counties_gdf
+            )
+    finally:
+        conn.close()
+
+    with _stage(timings, "build_output"):
+        output_df = pipeline.build_output(merged_df, midwest_counties_gdf, args.years)
+
+    if write:
+        with _stage(timings, "export_yearly_files"):
+            pipeline.export_yearly_files(output_df, args.output)
+        with _stage(timings, "export_backgrounds"):
+            pipeline.export_backgrounds(states_gdf, midwest_counties_gdf, args.output)
+
+    return output_df
+
+
+def build(args):
+    if not _check_inputs(args):
+        return 1
+
+    first_year, last_year = args.years
+    if args.dry_run:
+        print(f"would build {first_year}-{last_year} into {args.output}")
+        return 0
+
+    _run_build(args)
+    return 0
+
+
+def export(args):
+    if not _check_inputs(args, climate=False):
+        return 1
+
+    if args.dry_run:
+        print(f"would export background layers into {args.output}")
+        return 0
+
+    import sqlite3
+
+    from . import pipeline
+
+    states_gdf, counties_gdf = pipeline.load_geography()
+    conn = sqlite3.connect(args.db)
+    try:
+        midwest_counties_gdf = pipeline.load_midwest_counties(
+            conn, config.CROP_TABLE, counties_gdf
+        )
+    finally:
+        conn.close()
+
+    pipeline.export_backgrounds(states_gdf, midwest_counties_gdf, args.output)
+    return 0
+
+
+def bench(args):
+    if not _check_inputs(args):
+        return 1
+
+    if args.dry_run:
+        print("would time each pipeline stage without writing output")
+        return 0
+
+    timings = {}
+    with _stage(timings, "total"):
+        _run_build(args, write=args.write, timings=timings)
+
+    width = max(len(name) for name in timings)
+    for name, seconds in timings.items():
+        print(f"{name:<{width}}  {seconds:8.3f}s")
+    return 0
+
+
+def serve(args):
+    import functools
+    import http.server
+
+    handler = functools.partial(
+        http.server.SimpleHTTPRequestHandler, directory=str(args.output)
+    )
+    with http.server.ThreadingHTTPServer((args.bind, args.port), handler) as server:
+        print(f"serving {args.output} at http://{args.bind}:{args.port}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def _add_input_arguments(parser, climate=True):
+    parser.add_argument(
+        "--db", default=config.DB_PATH, help="path to the field crops SQLite database"
+    )
+    if climate:
+        parser.add_argument(
+            "--climate-dir",
+            default=config.CLIMATE_DIR,
+            help="directory holding the NOAA climdiv county files",
+        )
+    parser.add_argument(
+        "--output", default=config.OUTPUT_PATH, help="viz directory to write into"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="validate the configuration and exit without running",
+    )
+
+
+def _add_block_size_argument(parser):
+    parser.add_argument(
+        "--block-size",
+        type=_positive_int,
+        default=config.COUNTY_BLOCK_SIZE,
+        help="counties per block when building the county-year grid and rolling totals",
+    )
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        prog="corn-climate",
+        description="Build the county GeoJSON files behind the corn and climate map.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    default_years = "{}-{}".format(*config.OUTPUT_YEARS)
+
+    build_parser = subparsers.add_parser(
+        "build", help="run the full pipeline and write all GeoJSON files"
+    )
+    _add_input_arguments(build_parser)
+    build_parser.add_argument(
+        "--years",
+        type=_year_range,
+        default=config.OUTPUT_YEARS,
+        help=f"year or year range to write, e.g. 2020-2023 (default {default_years})",
+    )
+    _add_block_size_argument(build_parser)
+    build_parser.set_defaults(func=build)
+
+    export_parser = subparsers.add_parser(
+        "export", help="write only the county and state background layers"
+    )
+    _add_input_arguments(export_parser, climate=False)
+    export_parser.set_defaults(func=export)
+
+    bench_parser = subparsers.add_parser("bench", help="time each pipeline stage")
+    _add_input_arguments(bench_parser)
+    bench_parser.add_argument(
+        "--years",
+        type=_year_range,
+        default=config.OUTPUT_YEARS,
+        help=f"year or year range to build (default {default_years})",
+    )
+    _add_block_size_argument(bench_parser)
+    bench_parser.add_argument(
+        "--write", action="store_true", help="also time writing the GeoJSON files"
+    )
+    bench_parser.set_defaults(func=bench)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="serve the viz directory over HTTP for local preview"
+    )
+    serve_parser.add_argument(
+        "--output", default=config.OUTPUT_PATH, help="directory to serve"
+    )
+    serve_parser.add_argument("--bind", default="127.0.0.1", help="address to bind")
+    serve_parser.add_argument(
+        "--port", type=int, default=8000, help="port to listen on"
+    )
+    serve_parser.set_defaults(func=serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = make_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import datetime
+from pathlib import Path
+
+# Paths
+DATA_DIR = Path(__file__).resolve().parent.parent
+REPO_DIR = DATA_DIR.parent
+DB_PATH = DATA_DIR / "field_crops.db"
+CLIMATE_DIR = DATA_DIR / "climate_data"
+OUTPUT_PATH = REPO_DIR / "viz"
+
+# Database tables
+CROP_TABLE = "midwest_key_field_crops_cleaned"
+AREA_TABLE = "midwest_area_planted_cleaned"
+
+# Climate files, keyed by the annual column each one produces
+CLIMATE_FILES = {
+    "ann_avg_precip": "climdiv-pcpncy-v1.0.0-20241021.txt",
+    "ann_avg_temp": "climdiv-tmpccy-v1.0.0-20241021.txt",
+    "ann_max_temp": "climdiv-tmaxcy-v1.0.0-20241021.txt",
+    "ann_min_temp": "climdiv-tmincy-v1.0.0-20241021.txt",
+}
+
+# Years
+FIRST_YEAR = 1976
+BASELINE_YEAR = 1980
+OUTPUT_YEARS = (1980, 2023)
+
+# Number of counties per block when building the county-year grid and its
+# rolling totals; later stages still run on the full grid
+COUNTY_BLOCK_SIZE = 512
+
+MIDWESTERN_STATE_IDS = [17, 18, 19, 20, 26, 27, 29, 31, 38, 39, 46, 55]
+
+
+def current_year():
+    return datetime.date.today().year
+
+
+def parse_years(value):
+    """
+    Parse a year range such as "2020-2023" or a single year such as "2021".
+    """
+    start, sep, end = value.partition("-")
+    try:
+        start_year = int(start)
+        end_year = int(end) if sep else start_year
+    except ValueError:
+        raise ValueError(f"invalid year range {value!r}, expected YYYY or YYYY-YYYY")
+
+    if start_year > end_year:
+        raise ValueError(f"invalid year range {value!r}, start is after end")
+    if start_year < BASELINE_YEAR or end_year > current_year():
+        raise ValueError(
+            f"year range {value!r} must fall within {BASELINE_YEAR}-{current_year()}"
+        )
+
+    return start_year, end_year
+
+
+def missing_inputs(db_path, climate_dir=None):
+    """
+    Return the input files that the build needs but cannot find.
+
+    The climate files are only checked when climate_dir is given.
+    """
+    paths = [Path(db_path)]
+    if climate_dir is not None:
+        paths += [Path(climate_dir) / name for name in CLIMATE_FILES.values()]
+    return [path for path in paths if not path.exists()]
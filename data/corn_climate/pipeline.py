@@ -0,0 +1,517 @@
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+from vega_datasets import data
+
+from .config import (
+    BASELINE_YEAR,
+    CLIMATE_FILES,
+    COUNTY_BLOCK_SIZE,
+    FIRST_YEAR,
+    MIDWESTERN_STATE_IDS,
+    OUTPUT_YEARS,
+    current_year,
+)
+
+# Mapping and filtering codes
+noaa_midwest_codes = [
+    "11",
+    "12",
+    "13",
+    "14",
+    "20",
+    "21",
+    "23",
+    "25",
+    "32",
+    "33",
+    "39",
+    "47",
+]
+fips_mapping = {
+    "11": "17",
+    "12": "18",
+    "13": "19",
+    "14": "20",
+    "20": "26",
+    "21": "27",
+    "23": "29",
+    "25": "31",
+    "32": "38",
+    "33": "39",
+    "39": "46",
+    "47": "55",
+}
+final_df_cols = ["Year", "County_Code", "state_fips"]
+climate_columns = list(CLIMATE_FILES)
+features = ["rolling_avg_production", "rolling_yield", "ann_avg_temp", "ann_avg_precip"]
+
+
+def load_geography(url=data.us_10m.url):
+    """
+    Load the state and county layers of the US topology.
+    """
+    states_gdf = gpd.read_file(url, layer="states")
+    counties_gdf = gpd.read_file(url, layer="counties")
+    return states_gdf, counties_gdf
+
+
+def load_midwest_counties(conn, table, counties_gdf):
+    # Fetch distinct state_ansi values as a list
+    query = f"SELECT DISTINCT state_ansi FROM {table}"
+    state_ansi_list = pd.read_sql(query, conn).squeeze().tolist()
+
+    # Filter counties based on state_ansi and id length
+    midwest_counties_gdf = counties_gdf[
+        counties_gdf["id"].str[:2].isin(state_ansi_list)
+        & (counties_gdf["id"].str.len() == 5)
+    ]
+
+    # Remove duplicated 'id' values
+    midwest_counties_gdf_no_duplicates = midwest_counties_gdf.drop_duplicates(
+        subset="id", keep=False
+    )
+
+    # Group duplicated counties and merge geometries
+    duplicated_counties_gdf = midwest_counties_gdf[
+        midwest_counties_gdf.duplicated("id", keep=False)
+    ]
+    results = [
+        {"id": county, "geometry": county_records.geometry.unary_union}
+        for county, county_records in duplicated_counties_gdf.groupby("id")
+    ]
+
+    # Create GeoDataFrame for merged geometries
+    duplicated_counties_multi_gdf = gpd.GeoDataFrame(results, crs=counties_gdf.crs)
+
+    # Concatenate and return the final GeoDataFrame
+    final_counties_gdf = pd.concat(
+        [midwest_counties_gdf_no_duplicates, duplicated_counties_multi_gdf],
+        ignore_index=True,
+    )
+    final_counties_gdf = gpd.GeoDataFrame(final_counties_gdf, crs=counties_gdf.crs)
+
+    return final_counties_gdf
+
+
+def get_annual_corn_production(conn, table):
+    query = f"""
+    SELECT
+        state_name,
+        county_name,
+        year,
+        value AS annual_production,
+        state_ansi || county_ansi as id
+    FROM {table}
+    WHERE short_desc != 'CORN, SILAGE - PRODUCTION, MEASURED IN TONS'
+        AND commodity_desc = 'CORN'
+        AND asd_code != 99
+        AND county_ansi != ""
+        AND year > 1975
+    """
+    return pd.read_sql(query, conn)
+
+
+def get_annual_data(conn, crop_table, area_table):
+    production_query = f"""
+    SELECT
+        state_name,
+        state_alpha,
+        county_name,
+        year,
+        value AS annual_production,
+        state_ansi || county_ansi as id
+    FROM {crop_table}
+    WHERE short_desc != 'CORN, SILAGE - PRODUCTION, MEASURED IN TONS'
+        AND commodity_desc = 'CORN'
+        AND asd_code != 99
+        AND county_ansi != ""
+        AND year > 1975
+    """
+
+    area_query = f"""
+    SELECT
+        year,
+        value AS annual_area,
+        state_ansi || county_ansi as id
+    FROM {area_table}
+    WHERE short_desc != 'CORN, SILAGE - ACRES HARVESTED'
+        AND commodity_desc = 'CORN'
+        AND asd_code != 99
+        AND county_ansi != ""
+        AND year > 1975
+    """
+
+    prod_df = pd.read_sql(production_query, conn)
+    area_df = pd.read_sql(area_query, conn)
+
+    annual_data = pd.merge(prod_df, area_df, on=["id", "year"], how="outer")
+    annual_data["annual_yield"] = (
+        annual_data["annual_production"] / annual_data["annual_area"]
+    )
+
+    return annual_data
+
+
+def iter_county_year_blocks(
+    annual_data, first_year, last_year, block_size=COUNTY_BLOCK_SIZE
+):
+    """
+    Yield the dense county-year grid in blocks of block_size counties.
+
+    Each observation is located by integer (county_idx, year_idx) coordinates
+    and scattered into preallocated columns, so the scratch arrays and each
+    yielded block are bounded by block_size times the number of years. Rows
+    come out in the same order, and with the same values, as a left merge of
+    the county x year product against annual_data. With no counties a single
+    empty block is yielded so callers always get the grid's columns.
+    """
+    n_years = last_year - first_year + 1
+    county_idx, counties = pd.factorize(annual_data["id"], use_na_sentinel=False)
+    year_idx = annual_data["year"].to_numpy() - first_year
+
+    # Years outside the grid would be dropped by the merge
+    in_range = (year_idx >= 0) & (year_idx < n_years)
+    rows = np.flatnonzero(in_range)
+    cells = county_idx[in_range] * n_years + year_idx[in_range]
+
+    # Sort observations by cell once, keeping source order for duplicates
+    order = np.argsort(cells, kind="stable")
+    rows, cells = rows[order], cells[order]
+
+    value_columns = [col for col in annual_data.columns if col not in ("id", "year")]
+
+    for block_start in range(0, max(len(counties), 1), block_size):
+        block_end = min(block_start + block_size, len(counties))
+        cell_start, cell_end = block_start * n_years, block_end * n_years
+        lo, hi = np.searchsorted(cells, [cell_start, cell_end])
+        block_rows, block_cells = rows[lo:hi], cells[lo:hi] - cell_start
+
+        # A cell observed k times expands to k rows, an empty cell to one row
+        counts = np.bincount(block_cells, minlength=cell_end - cell_start)
+        repeats = np.maximum(counts, 1)
+        grid_cells = np.repeat(np.arange(cell_start, cell_end), repeats)
+
+        # Scatter each observation into its row; empty cells keep -1
+        row_starts = np.cumsum(repeats) - repeats
+        first_obs = np.cumsum(counts) - counts
+        rank = np.arange(len(block_cells)) - first_obs[block_cells]
+        indexer = np.full(len(grid_cells), -1, dtype=np.intp)
+        indexer[row_starts[block_cells] + rank] = block_rows
+
+        block = {
+            "id": counties.take(grid_cells // n_years),
+            "year": first_year + grid_cells % n_years,
+        }
+        for col in value_columns:
+            block[col] = take(annual_data[col].array, indexer, allow_fill=True)
+
+        yield pd.DataFrame(block)
+
+
+def build_rolling_grid(
+    annual_data, first_year=FIRST_YEAR, last_year=None, block_size=COUNTY_BLOCK_SIZE
+):
+    """
+    Build the county-year grid with rolling metrics, one county block at a time.
+
+    The rolling totals only look within a county, so they are computed per
+    block and the raw annual columns are dropped before the blocks are joined.
+    The per-year percentile ranks need every county and run on the joined
+    frame, which is therefore still the size of the reduced grid.
+    """
+    if last_year is None:
+        last_year = current_year()
+
+    blocks = iter_county_year_blocks(annual_data, first_year, last_year, block_size)
+    annual_data = pd.concat(
+        (add_rolling_totals(block) for block in blocks), ignore_index=True
+    )
+    return add_percentile_ranks(annual_data)
+
+
+def add_rolling_totals(annual_data):
+    """
+    Add 5-year rolling production and yield for each county.
+    """
+    # Calculate 5-year rolling sums for both production and area
+    annual_data["rolling_production"] = annual_data.groupby("id")[
+        "annual_production"
+    ].transform(lambda x: x.rolling(window=5, min_periods=1).sum())
+    annual_data["rolling_area"] = annual_data.groupby("id")["annual_area"].transform(
+        lambda x: x.rolling(window=5, min_periods=1).sum()
+    )
+
+    # Add rolling average production calculation
+    annual_data["rolling_avg_production"] = (
+        annual_data.groupby("id")["annual_production"]
+        .transform(lambda x: x.rolling(window=5, min_periods=1).mean())
+        .round(2)
+    )
+
+    # Calculate yield based on rolling totals and round
+    annual_data["rolling_yield"] = (
+        annual_data["rolling_production"] / annual_data["rolling_area"]
+    ).round(2)
+
+    # Clean up intermediate columns
+    return annual_data.drop(
+        [
+            "rolling_area",
+            "annual_production",
+            "rolling_production",
+            "annual_area",
+            "annual_yield",
+        ],
+        axis=1,
+    )
+
+
+def add_percentile_ranks(annual_data):
+    """
+    Rank rolling yield and production within each year.
+    """
+    # Calculate percentile ranks within each year
+    annual_data["yield_percentile"] = percentile_rank(annual_data, "rolling_yield")
+
+    # Update to use rolling average production for percentile
+    annual_data["production_percentile"] = percentile_rank(
+        annual_data, "rolling_avg_production"
+    )
+
+    return annual_data
+
+
+def percentile_rank(df, column):
+    """
+    Rank a column within each year as an integer percentile, -1 where missing.
+    """
+    return (
+        df.groupby("year")[column]
+        .transform(lambda x: x.rank(pct=True).round(2) * 100)
+        .fillna(-1)
+        .astype(int)
+    )
+
+
+def parse_climdiv_data(
+    file_path,
+    yearly_avg_column_name,
+    midwest_codes=noaa_midwest_codes,
+    final_df_cols=final_df_cols,
+):
+    column_specs = [
+        (0, 2),
+        (2, 5),
+        (5, 7),
+        (7, 11),
+        (11, 18),
+        (18, 25),
+        (25, 32),
+        (32, 39),
+        (39, 46),
+        (46, 53),
+        (53, 60),
+        (60, 67),
+        (67, 74),
+        (74, 81),
+        (81, 88),
+        (88, 95),
+    ]
+
+    column_names = [
+        "State_Code",
+        "Division_Number",
+        "Element_Code",
+        "Year",
+        "Jan_Value",
+        "Feb_Value",
+        "Mar_Value",
+        "Apr_Value",
+        "May_Value",
+        "Jun_Value",
+        "Jul_Value",
+        "Aug_Value",
+        "Sep_Value",
+        "Oct_Value",
+        "Nov_Value",
+        "Dec_Value",
+    ]
+
+    df = pd.read_fwf(
+        file_path,
+        colspecs=column_specs,
+        names=column_names,
+        dtype={"State_Code": str, "Division_Number": str},
+    )
+
+    df["state_fips"] = df["State_Code"].map(fips_mapping)
+    df["County_Code"] = df["state_fips"] + df["Division_Number"]
+    numeric_columns = column_names[4:]
+    df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors="coerce")
+
+    df.replace(
+        {
+            "Jan_Value": {-99.99: None, -9.99: None},
+            "Feb_Value": {-99.99: None, -9.99: None},
+            "Mar_Value": {-99.99: None, -9.99: None},
+            "Apr_Value": {-99.99: None, -9.99: None},
+            "May_Value": {-99.99: None, -9.99: None},
+            "Jun_Value": {-99.99: None, -9.99: None},
+            "Jul_Value": {-99.99: None, -9.99: None},
+            "Aug_Value": {-99.99: None, -9.99: None},
+            "Sep_Value": {-99.99: None, -9.99: None},
+            "Oct_Value": {-99.99: None, -9.99: None},
+            "Nov_Value": {-99.99: None, -9.99: None},
+            "Dec_Value": {-99.99: None, -9.99: None},
+        },
+        inplace=True,
+    )
+
+    df[yearly_avg_column_name] = df[numeric_columns].mean(axis=1)
+
+    midwest_df = df[df["State_Code"].isin(midwest_codes)]
+    midwest_df_post1950 = midwest_df[midwest_df["Year"] > 1950]
+
+    output_columns = final_df_cols + [yearly_avg_column_name]
+
+    return midwest_df_post1950[output_columns]
+
+
+def load_climate_data(climate_dir):
+    """
+    Parse the NOAA county files and compute 30-year rolling climate normals.
+    """
+    # Parse climate data
+    climate_dfs = [
+        parse_climdiv_data(os.path.join(climate_dir, file_name), column)
+        for column, file_name in CLIMATE_FILES.items()
+    ]
+
+    merge_cols = ["Year", "County_Code", "state_fips"]
+    annual_climate_data_df = climate_dfs[0]
+    for climate_df in climate_dfs[1:]:
+        annual_climate_data_df = annual_climate_data_df.merge(climate_df, on=merge_cols)
+    annual_climate_data_df = annual_climate_data_df.sort_values(
+        by=["County_Code", "Year"]
+    )
+
+    # Round climate columns to 2 decimal places
+    annual_climate_data_df[climate_columns] = annual_climate_data_df[
+        climate_columns
+    ].round(2)
+
+    rolling_avg_30yr_climate_data_df = (
+        annual_climate_data_df.groupby("County_Code")[["Year"] + climate_columns]
+        .apply(lambda x: x.set_index("Year").rolling(window=30).mean())
+        .reset_index()
+    )
+
+    # Round the rolling averages to 2 decimal places
+    rolling_avg_30yr_climate_data_df[climate_columns] = (
+        rolling_avg_30yr_climate_data_df[climate_columns].round(2)
+    )
+
+    return rolling_avg_30yr_climate_data_df.rename(
+        columns={"County_Code": "id", "Year": "year"}
+    )
+
+
+def merge_climate_data(annual_data, climate_df):
+    """
+    Join the climate normals onto the county-year grid and rank them by year.
+    """
+    merged_df = pd.merge(annual_data, climate_df, on=["id", "year"], how="left")
+
+    # Calculate percentile ranks within each year
+    merged_df["precip_percentile"] = percentile_rank(merged_df, "ann_avg_precip")
+    merged_df["temp_percentile"] = percentile_rank(merged_df, "ann_avg_temp")
+
+    return merged_df
+
+
+def build_output(merged_df, midwest_counties_gdf, years):
+    """
+    Attach county geometries and compute changes relative to the baseline year.
+    """
+    merged = gpd.GeoDataFrame(
+        pd.merge(merged_df, midwest_counties_gdf, on="id", how="left")
+    )
+    merged.set_geometry("geometry", inplace=True)
+
+    # Filter data to the full output window so that a narrower year range
+    # yields exactly the same rows as the default build
+    first_year, last_year = years
+    output_df = merged[
+        (merged["year"] >= min(first_year, OUTPUT_YEARS[0]))
+        & (merged["year"] <= max(last_year, OUTPUT_YEARS[1]))
+    ].copy()
+    output_df.set_crs("EPSG:4326", inplace=True)
+
+    # Fill missing county_name, state_name, and state_alpha based on available data for the same 'id'
+    name_columns = ["county_name", "state_name", "state_alpha"]
+    output_df[name_columns] = output_df.groupby("id")[name_columns].ffill()
+    output_df[name_columns] = output_df.groupby("id")[name_columns].bfill()
+
+    df = output_df.sort_values(by=["id", "year"])
+
+    for feature in features:
+        first_year_values = df[df["year"] == BASELINE_YEAR].set_index("id")[feature]
+        df[f"{feature}_{BASELINE_YEAR}"] = df["id"].map(first_year_values)
+        df[f"{feature}_abs_change_from_{BASELINE_YEAR}"] = (
+            df[feature] - df[f"{feature}_{BASELINE_YEAR}"]
+        ).round(2)
+        df[f"{feature}_percentage_change_from_{BASELINE_YEAR}"] = (
+            df[f"{feature}_abs_change_from_{BASELINE_YEAR}"]
+            / df[f"{feature}_{BASELINE_YEAR}"]
+        ) * 100
+        df[f"{feature}_percentage_change_from_{BASELINE_YEAR}"] = df[
+            f"{feature}_percentage_change_from_{BASELINE_YEAR}"
+        ].round(2)
+        # Drop the temporary baseline column after calculations
+        df = df.drop(columns=[f"{feature}_{BASELINE_YEAR}"])
+
+    output_df = df[(df["year"] >= first_year) & (df["year"] <= last_year)]
+    output_df.set_crs("EPSG:4326", inplace=True)
+
+    return output_df
+
+
+def export_yearly_files(output_df, output_path):
+    """
+    Write one GeoJSON file per year to the output_data folder.
+    """
+    output_dir = os.path.join(output_path, "output_data")
+    os.makedirs(output_dir, exist_ok=True)
+
+    for year in output_df["year"].unique():
+        year_df = output_df[output_df["year"] == year]
+        year_filename = os.path.join(output_dir, f"output_{year}.geojson")
+        year_df.to_file(year_filename, driver="GeoJSON")
+
+
+def export_backgrounds(states_gdf, midwest_counties_gdf, output_path):
+    """
+    Write the county and state background layers used by the map.
+    """
+    output_dir = os.path.join(output_path, "backgrounds")
+    os.makedirs(output_dir, exist_ok=True)
+
+    midwest_counties_gdf.set_crs("EPSG:4326", inplace=True)
+    midwest_counties_gdf.to_file(
+        os.path.join(output_dir, "counties.geojson"), driver="GeoJSON"
+    )
+
+    midwest_states_gdf = states_gdf[
+        states_gdf["id"].astype(int).isin(MIDWESTERN_STATE_IDS)
+    ]
+    midwest_states_gdf.set_crs("EPSG:4326", inplace=True)
+    midwest_states_gdf.to_file(
+        os.path.join(output_dir, "states.geojson"), driver="GeoJSON"
+    )
+
+    states_gdf.set_crs("EPSG:4326", inplace=True)
+    states_gdf.to_file(os.path.join(output_dir, "all_states.geojson"), driver="GeoJSON")
@@ -1,8 +1,7 @@
-import pandas as pd
-import sqlite3
-from vega_datasets import data
-import geopandas as gpd
 import os
+import sqlite3
+
+import pandas as pd
 
 # Configuration
 DB_NAME = "field_crops.db"
@@ -149,6 +148,9 @@ def get_annual_data(conn, crop_table, area_table):
 
 
 def main():
+    import geopandas as gpd
+    from vega_datasets import data
+
     # Load geographic data
     url = data.us_10m.url
     states_gdf = gpd.read_file(url, layer="states")
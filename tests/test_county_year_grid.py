@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from corn_climate import pipeline
+
+FIRST_YEAR = 1976
+LAST_YEAR = 1980
+
+
+def reference_county_year_grid(annual_data, first_year, last_year):
+    """
+    Build the county-year grid the original way, with a product and a merge.
+    """
+    counties = annual_data["id"].unique()
+    years = pd.Series(range(first_year, last_year + 1))
+    all_combinations = pd.MultiIndex.from_product(
+        [counties, years], names=["id", "year"]
+    )
+    all_combinations = pd.DataFrame(
+        all_combinations.to_flat_index().tolist(), columns=["id", "year"]
+    )
+
+    return all_combinations.merge(annual_data, on=["id", "year"], how="left")
+
+
+def blocked_county_year_grid(annual_data, first_year, last_year, block_size):
+    blocks = pipeline.iter_county_year_blocks(
+        annual_data, first_year, last_year, block_size
+    )
+    return pd.concat(blocks, ignore_index=True)
+
+
+@pytest.fixture
+def annual_data():
+    return pd.DataFrame(
+        {
+            "id": ["17003", "17001", "17003", "19001", "17001", "17003", np.nan],
+            # 17003 has two rows for 1977, 17001 has one year past LAST_YEAR
+            "year": [1977, 1976, 1977, 1980, 2099, 1978, 1979],
+            "state_name": ["ILLINOIS", None, "ILLINOIS", "IOWA", "X", "ILLINOIS", "Y"],
+            "count": [1, 2, 3, 4, 5, 6, 7],
+            "annual_production": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0],
+            "annual_area": [1.0, 1.0, np.nan, 2.0, 5.0, 3.0, 1.0],
+        }
+    )
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 10])
+def test_grid_matches_reference(annual_data, block_size):
+    expected = reference_county_year_grid(annual_data, FIRST_YEAR, LAST_YEAR)
+    actual = blocked_county_year_grid(annual_data, FIRST_YEAR, LAST_YEAR, block_size)
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_grid_keeps_int_columns_without_gaps():
+    annual_data = pd.DataFrame(
+        {
+            "id": ["a", "a", "b", "b"],
+            "year": [1976, 1977, 1976, 1977],
+            "n": [1, 2, 3, 4],
+        }
+    )
+    expected = reference_county_year_grid(annual_data, 1976, 1977)
+    actual = blocked_county_year_grid(annual_data, 1976, 1977, block_size=1)
+    pd.testing.assert_frame_equal(actual, expected)
+    assert actual["n"].dtype == np.int64
+
+
+def test_grid_with_no_counties(annual_data):
+    empty = annual_data.iloc[:0]
+    expected = reference_county_year_grid(empty, FIRST_YEAR, LAST_YEAR)
+    actual = blocked_county_year_grid(empty, FIRST_YEAR, LAST_YEAR, block_size=2)
+    # The reference grid infers object years from an empty list of tuples
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 10])
+def test_rolling_grid_matches_reference(annual_data, block_size):
+    annual_data = annual_data.drop(columns="count")
+    annual_data["state_alpha"] = "IL"
+    annual_data["annual_yield"] = (
+        annual_data["annual_production"] / annual_data["annual_area"]
+    )
+    grid = reference_county_year_grid(annual_data, FIRST_YEAR, LAST_YEAR)
+    # Rolling totals and ranks computed over the whole reference grid at once
+    expected = pipeline.add_percentile_ranks(pipeline.add_rolling_totals(grid))
+    actual = pipeline.build_rolling_grid(
+        annual_data, FIRST_YEAR, LAST_YEAR, block_size=block_size
+    )
+    pd.testing.assert_frame_equal(actual, expected)